@@ -0,0 +1,26 @@
+"""
+Git Auto Commit Message Generator - daemon socket location
+Shared by git-auto-commit.py and git-auto-commit-client.py so both always
+agree on where the daemon listens. Only uses the standard library.
+"""
+
+import os
+import sys
+import stat
+import tempfile
+
+def get_daemon_socket_path():
+    """Get the path of the daemon's Unix socket."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, f'git-autocommit-{os.getuid()}.sock')
+
+    # The temporary directory is shared with other users, so keep the socket
+    # in a directory that only the current user owns and can enter
+    runtime_dir = os.path.join(tempfile.gettempdir(), f'git-autocommit-{os.getuid()}')
+    os.makedirs(runtime_dir, mode=0o700, exist_ok=True)
+    info = os.lstat(runtime_dir)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        print(f"Error: {runtime_dir} must be a directory private to the current user")
+        sys.exit(1)
+    return os.path.join(runtime_dir, 'git-autocommit.sock')
@@ -0,0 +1,33 @@
+#!/bin/bash
+# Build script for a standalone git-autocommit binary
+#
+# Compiles git-auto-commit.py ahead of time with Nuitka, so each commit no
+# longer pays for interpreter start-up and module imports. Optional
+# dependencies that are installed when building (openai, pygit2, tiktoken)
+# are bundled. The result is a standalone folder rather than a onefile
+# executable, which would unpack the whole bundle to a temporary directory
+# on every launch.
+
+# Determine the script directory
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+BUILD_DIR="$SCRIPT_DIR/build"
+DIST_DIR="$BUILD_DIR/git-auto-commit.dist"
+
+# Install build dependencies
+echo "Installing Nuitka and the required Python dependencies..."
+pip install nuitka
+pip install -r "$SCRIPT_DIR/requirements.txt"
+
+# Compile the script
+echo "Compiling git-auto-commit.py (this can take several minutes)..."
+if ! python -m nuitka --standalone --lto=yes --assume-yes-for-downloads \
+        --output-dir="$BUILD_DIR" --output-filename=git-autocommit \
+        "$SCRIPT_DIR/git-auto-commit.py"; then
+    echo "Error: Build failed. Nuitka needs a C compiler (and patchelf on Linux)."
+    exit 1
+fi
+
+echo "Build complete! The program is in $DIST_DIR"
+echo "To use it as the 'git autocommit' command, install the folder and link the binary:"
+echo "sudo cp -r \"$DIST_DIR\" /usr/local/lib/git-autocommit"
+echo "sudo ln -sf /usr/local/lib/git-autocommit/git-autocommit /usr/local/bin/git-autocommit"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Git Auto Commit Message Generator - daemon client
+Forwards a git-autocommit run to a warm `git-auto-commit.py --daemon` process,
+starting the daemon first if it is not running. Only uses the standard library
+so the client itself starts quickly.
+"""
+
+import os
+import sys
+import json
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+from autocommit_socket import get_daemon_socket_path
+
+def check_daemon_owner(sock, socket_path):
+    """Make sure the daemon runs as the current user before sending it anything."""
+    if hasattr(socket, 'SO_PEERCRED'):
+        # Linux reports the (pid, uid, gid) of the process that is listening
+        _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                        struct.calcsize('3i')))
+    else:
+        uid = os.stat(socket_path).st_uid
+    if uid != os.getuid():
+        print(f"Error: {socket_path} belongs to another user; refusing to connect")
+        sys.exit(1)
+
+def connect():
+    """Connect to the daemon, starting it if needed."""
+    socket_path = get_daemon_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        check_daemon_owner(sock, socket_path)
+        return sock
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    subprocess.Popen([sys.executable, os.path.join(script_dir, 'git-auto-commit.py'), '--daemon'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+    # Wait for the daemon to start listening
+    for _ in range(100):
+        time.sleep(0.05)
+        try:
+            sock.connect(socket_path)
+            check_daemon_owner(sock, socket_path)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            continue
+
+    print(f"Error: Could not start the git-autocommit daemon at {socket_path}")
+    sys.exit(1)
+
+def forward_stdin(sock):
+    """Send the user's input to the daemon as it is typed."""
+    for line in sys.stdin:
+        sock.sendall(line.encode('utf-8'))
+    sock.shutdown(socket.SHUT_WR)
+
+def main():
+    sock = connect()
+    request = {
+        'cwd': os.getcwd(),
+        'argv': sys.argv[1:],
+        'env': dict(os.environ)
+    }
+    sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+    threading.Thread(target=forward_stdin, args=(sock,), daemon=True).start()
+
+    # Output ends with a NUL byte followed by the exit code
+    exit_code = b''
+    finished = False
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        if finished:
+            exit_code += data
+            continue
+        output, nul, rest = data.partition(b'\0')
+        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
+        if nul:
+            finished = True
+            exit_code += rest
+
+    sys.exit(int(exit_code) if exit_code else 1)
+
+if __name__ == "__main__":
+    main()
@@ -8,21 +8,230 @@ Supports both rule-based and AI-powered commit message generation.
 import os
 import sys
 import subprocess
-import configparser
-from git import Repo
+import importlib.util
 import re
 import argparse
 import json
+import hashlib
+import tempfile
+from collections import Counter
 
-# Optional import for OpenAI integration
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+def is_installed(module_name):
+    """Check whether an optional dependency can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError:
+        # Compiled builds raise instead of returning None for left-out modules
+        return False
+
+# Optional dependencies. They are only located here and imported where they
+# are used, so paths that never need them (--setup, rule-based messages)
+# don't pay their import cost.
+# OpenAI integration
+OPENAI_AVAILABLE = is_installed('openai')
+# libgit2 bindings (avoids spawning git to read diffs)
+PYGIT2_AVAILABLE = is_installed('pygit2')
+# Counting prompt tokens exactly
+TIKTOKEN_AVAILABLE = is_installed('tiktoken')
+
+# Scope used in multi-file commit messages when all files share an extension
+EXTENSION_SCOPES = {
+    'js': 'JavaScript',
+    'ts': 'JavaScript',
+    'py': 'Python',
+    'css': 'styles',
+    'scss': 'styles',
+    'html': 'HTML',
+    'md': 'documentation',
+    'txt': 'documentation',
+    'json': 'configuration',
+    'yaml': 'configuration',
+    'yml': 'configuration',
+    'toml': 'configuration'
+}
+
+# Lockfiles and minified assets whose diffs say little about the change
+GENERATED_FILE_RE = re.compile(r'(package-lock\.json|yarn\.lock|\.min\.(js|css)|Gopkg\.lock)$')
+
+# Boundaries of per-file sections and hunks within a diff
+FILE_DIFF_START_RE = re.compile(r'^(?=diff --git )', re.MULTILINE)
+HUNK_START_RE = re.compile(r'^(?=@@ )', re.MULTILINE)
+
+# Byte values of the backslash escapes in quoted paths of diff headers
+GIT_QUOTED_ESCAPES = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13}
+
+# Completed "subject" string in a (possibly partial) streamed JSON response
+SUBJECT_RE = re.compile(r'"subject"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+# Number of prompt tokens to spend on the diff, keeping some room for the prompt
+DIFF_TOKEN_BUDGET = 1000
+
+# Most per-file summaries asked for in one response, and the completion tokens
+# allowed for each of them (plus a fixed amount for the subject and details)
+PER_FILE_SUMMARY_LIMIT = 25
+PER_FILE_SUMMARY_TOKENS = 60
+
+class GitBackend:
+    """Read-only access to the staged changes of a repository.
+
+    Diffs are read once and served from memory, so asking for the changes of
+    N files does not spawn N git processes. Uses pygit2 when it is installed
+    and falls back to git otherwise. Without pygit2 the patch text is only
+    read up front when `prefetch_diff` is set, so callers that never look at
+    the diff (the rule-based path) only pay for the name-status.
+    """
+
+    def __init__(self, git_root, prefetch_diff=False):
+        self.git_root = git_root
+        self.prefetch_diff = prefetch_diff
+        self._use_pygit2 = PYGIT2_AVAILABLE
+        self._repo = None
+        self._diffs = {}
+        self._staged_files = None
+        self._full_diff = None
+        self._file_diffs = None
+
+    def _pygit2_diff(self, typechange=False):
+        """Diff the index against HEAD with pygit2, or return None if unusable.
+        
+        With `typechange` a type change is one T delta, as in git's
+        name-status. Without it libgit2 splits it into a deletion and an
+        addition of the same path, whose patches hold the content the way
+        git's patch output does (a T delta's patch has no hunks).
+        """
+        if not self._use_pygit2:
+            return None
+        if typechange not in self._diffs:
+            import pygit2
+            try:
+                if self._repo is None:
+                    self._repo = pygit2.Repository(self.git_root)
+                # No HEAD to diff against yet; let git handle the first commit
+                if self._repo.head_is_unborn:
+                    self._use_pygit2 = False
+                    return None
+                flags = pygit2.enums.DiffOption.INCLUDE_TYPECHANGE if typechange else 0
+                diff = self._repo.index.diff_to_tree(self._repo.head.peel(pygit2.Tree), flags=flags)
+                # Detect renames whatever diff.renames says, as the git calls do with -M
+                diff.find_similar(flags=pygit2.enums.DiffFind.FIND_RENAMES)
+                self._diffs[typechange] = diff
+            except pygit2.GitError:
+                self._use_pygit2 = False
+                return None
+        return self._diffs[typechange]
+
+    def _load_bundle(self):
+        """Fill the name-status and full diff from a single git call."""
+        self._staged_files, self._full_diff = fetch_staged_bundle(self.git_root)
+
+    def staged_name_status(self):
+        """Return a list of (status, path) tuples for the staged files."""
+        if self._staged_files is None:
+            diff = self._pygit2_diff(typechange=True)
+            if diff is not None:
+                self._staged_files = [(delta.status_char(), delta.new_file.path)
+                                      for delta in diff.deltas]
+            elif self.prefetch_diff:
+                self._load_bundle()
+            else:
+                self._staged_files = []
+                staged_diff = run_git(self.git_root, 'diff', '--cached', '--name-status', '-z',
+                                      '--no-color', '-M')
+                # NUL-delimited "STATUS\0PATH\0" records, so paths with tabs or
+                # newlines come through verbatim; renames and copies ("R100")
+                # carry the source path before the destination
+                fields = staged_diff.decode('utf-8', errors='replace').split('\0')
+                i = 0
+                while i < len(fields) - 1:
+                    status = fields[i]
+                    if status[0] in 'RC':
+                        i += 1
+                    self._staged_files.append((status[0], fields[i + 1]))
+                    i += 2
+        return self._staged_files
+
+    def staged_full_diff(self):
+        """Return the full patch text of the staged changes."""
+        if self._full_diff is None:
+            diff = self._pygit2_diff()
+            if diff is not None:
+                self._full_diff = (diff.patch or '').rstrip('\n')
+            else:
+                # Refetching the name-status alongside is cheaper than a second format
+                self._load_bundle()
+        return self._full_diff
+
+    def staged_diff(self, file_path):
+        """Return the patch text of a single staged file."""
+        if self._file_diffs is None:
+            # Split by the paths in the headers with either backend, so the
+            # two halves of a type change end up under one path
+            self._file_diffs = dict(split_diff_by_file(self.staged_full_diff()))
+        return self._file_diffs.get(file_path, '')
+
+def run_git(git_root, *args):
+    """Run a git command in the repository and return its raw output."""
+    command = ('git', '-C', git_root) + args
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    # Relay git's messages (and those of its hooks) through sys.stderr, which
+    # in daemon mode is the client's terminal rather than the daemon's
+    if result.stderr:
+        sys.stderr.write(result.stderr.decode('utf-8', errors='replace'))
+        sys.stderr.flush()
+    if result.returncode:
+        raise subprocess.CalledProcessError(result.returncode, command, result.stdout, result.stderr)
+    return result.stdout
+
+def fetch_staged_bundle(git_root):
+    """Get the staged files and the full staged diff from one git invocation.
+    
+    Runs `git diff --cached --raw -z --patch`, whose output is the raw
+    name-status records (NUL-delimited, terminated by an empty record)
+    followed by the patch text.
+    """
+    # Plain output whatever the user's configuration says: fixed path
+    # prefixes (diff.noprefix, diff.mnemonicPrefix) so the per-file sections
+    # can be keyed by the paths in their headers, no colors (color.ui) or
+    # external diff driver (diff.external), and renames detected as pygit2
+    # does (diff.renames)
+    output = run_git(git_root, 'diff', '--cached', '--raw', '-z', '--patch',
+                     '--src-prefix=a/', '--dst-prefix=b/', '--no-color', '--no-ext-diff', '-M')
+    header, _, patch = output.partition(b'\0\0')
+    
+    staged_files = []
+    fields = header.split(b'\0') if header else []
+    i = 0
+    while i < len(fields):
+        # ":<old mode> <new mode> <old sha> <new sha> <status>" then the path(s);
+        # renames and copies carry both the source and destination path
+        status = fields[i].split()[-1].decode('ascii')
+        if status[0] in 'RC':
+            file_path = fields[i + 2]
+            i += 3
+        else:
+            file_path = fields[i + 1]
+            i += 2
+        staged_files.append((status[0], file_path.decode('utf-8', errors='replace')))
+    
+    return staged_files, patch.decode('utf-8', errors='replace').rstrip('\n')
 
 def get_git_root():
     """Get the root directory of the Git repository."""
+    # Walk up from the working directory looking for .git (a directory, or a
+    # file for worktrees and submodules) instead of spawning git. Let git
+    # resolve the repository when the environment overrides its location.
+    if 'GIT_DIR' not in os.environ and 'GIT_WORK_TREE' not in os.environ:
+        path = os.getcwd()
+        while True:
+            if os.path.exists(os.path.join(path, '.git')):
+                return path
+            parent = os.path.dirname(path)
+            if parent == path:
+                print("Error: Not a git repository (or any of the parent directories)")
+                sys.exit(1)
+            path = parent
+    
     try:
         git_root = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'], 
                                           stderr=subprocess.STDOUT).decode('utf-8').strip()
@@ -31,6 +240,58 @@ def get_git_root():
         print("Error: Not a git repository (or any of the parent directories)")
         sys.exit(1)
 
+# Values accepted for boolean settings, as in configparser
+BOOLEAN_STATES = {
+    '1': True, 'yes': True, 'true': True, 'on': True,
+    '0': False, 'no': False, 'false': False, 'off': False
+}
+
+def parse_boolean(value):
+    """Convert a boolean setting to a bool."""
+    if value.lower() not in BOOLEAN_STATES:
+        raise ValueError(f"Not a boolean: {value}")
+    return BOOLEAN_STATES[value.lower()]
+
+def read_ini_section(config_file, section):
+    """Read the settings of one section of an INI-style file.
+    
+    Accepts the same lines as configparser's defaults: `key = value` or
+    `key: value` (split at whichever delimiter comes first), comments
+    starting with # or ;, and values continued on indented lines, which are
+    joined with newlines. Other lines are skipped with a warning.
+    """
+    values = {}
+    current_section = None
+    key = None
+    with open(config_file) as f:
+        for line_number, line in enumerate(f, 1):
+            stripped = line.strip()
+            if not stripped:
+                key = None
+                continue
+            if stripped[0] in '#;':
+                continue
+            if line[0].isspace() and key is not None:
+                # Continuations are recognized in every section, but only
+                # kept for the one asked for
+                if current_section == section:
+                    values[key] += '\n' + stripped
+                continue
+            
+            key = None
+            if stripped.startswith('[') and stripped.endswith(']'):
+                current_section = stripped[1:-1].strip()
+                continue
+            
+            delimiters = [i for i in (stripped.find('='), stripped.find(':')) if i >= 0]
+            if current_section is None or not delimiters or min(delimiters) == 0:
+                print(f"Warning: ignoring line {line_number} of {config_file}: {stripped}")
+                continue
+            key = stripped[:min(delimiters)].strip().lower()
+            if current_section == section:
+                values[key] = stripped[min(delimiters) + 1:].strip()
+    return values
+
 def get_config(git_root):
     """Read configuration from .git-autocommit file if it exists."""
     config = {
@@ -41,33 +302,34 @@ def get_config(git_root):
         'openai_api_key': '',
         'openai_model': 'gpt-3.5-turbo',
         'conventional_commits': False,
-        'detailed_by_default': False
+        'detailed_by_default': False,
+        'commit_cache_size': 32
     }
     
     config_file = os.path.join(git_root, '.git-autocommit')
     if os.path.exists(config_file):
-        parser = configparser.ConfigParser()
-        parser.read(config_file)
-        if 'autocommit' in parser:
-            if 'prefix' in parser['autocommit']:
-                config['prefix'] = parser['autocommit']['prefix']
-            if 'prefixes' in parser['autocommit']:
-                # Parse the comma-separated list of prefixes
-                prefixes_str = parser['autocommit']['prefixes']
-                if prefixes_str:
-                    config['prefixes'] = [p.strip() for p in prefixes_str.split(',')]
-            if 'max_length' in parser['autocommit']:
-                config['max_length'] = int(parser['autocommit']['max_length'])
-            if 'use_ai' in parser['autocommit']:
-                config['use_ai'] = parser['autocommit'].getboolean('use_ai')
-            if 'openai_api_key' in parser['autocommit']:
-                config['openai_api_key'] = parser['autocommit']['openai_api_key']
-            if 'openai_model' in parser['autocommit']:
-                config['openai_model'] = parser['autocommit']['openai_model']
-            if 'conventional_commits' in parser['autocommit']:
-                config['conventional_commits'] = parser['autocommit'].getboolean('conventional_commits')
-            if 'detailed_by_default' in parser['autocommit']:
-                config['detailed_by_default'] = parser['autocommit'].getboolean('detailed_by_default')
+        values = read_ini_section(config_file, 'autocommit')
+        if 'prefix' in values:
+            config['prefix'] = values['prefix']
+        if 'prefixes' in values:
+            # Parse the list of prefixes, separated by commas or continuation lines
+            prefixes_str = values['prefixes'].replace('\n', ',')
+            if prefixes_str.strip(','):
+                config['prefixes'] = [p.strip() for p in prefixes_str.split(',') if p.strip()]
+        if 'max_length' in values:
+            config['max_length'] = int(values['max_length'])
+        if 'use_ai' in values:
+            config['use_ai'] = parse_boolean(values['use_ai'])
+        if 'openai_api_key' in values:
+            config['openai_api_key'] = values['openai_api_key']
+        if 'openai_model' in values:
+            config['openai_model'] = values['openai_model']
+        if 'conventional_commits' in values:
+            config['conventional_commits'] = parse_boolean(values['conventional_commits'])
+        if 'detailed_by_default' in values:
+            config['detailed_by_default'] = parse_boolean(values['detailed_by_default'])
+        if 'commit_cache_size' in values:
+            config['commit_cache_size'] = int(values['commit_cache_size'])
     
     # Check for environment variable override for API key
     if 'OPENAI_API_KEY' in os.environ:
@@ -75,82 +337,77 @@ def get_config(git_root):
     
     return config
 
-def get_staged_files(repo):
+def get_staged_files(backend):
     """Get list of staged files with their status."""
-    staged_files = []
-    staged_diff = repo.git.diff('--cached', '--name-status')
+    staged_files = backend.staged_name_status()
     
-    if not staged_diff:
+    if not staged_files:
         print("No changes staged for commit.")
         sys.exit(1)
     
-    for line in staged_diff.split('\n'):
-        if not line:
-            continue
-        status, file_path = re.match(r'(\w)\s+(.*)', line).groups()
-        staged_files.append((status, file_path))
-    
     return staged_files
 
 def categorize_changes(staged_files):
     """Categorize changes by type and file extension."""
     categories = {
-        'A': {'count': 0, 'files': []},  # Added
-        'M': {'count': 0, 'files': []},  # Modified
-        'D': {'count': 0, 'files': []},  # Deleted
-        'R': {'count': 0, 'files': []},  # Renamed
-        'C': {'count': 0, 'files': []}   # Copied
+        'A': 0,  # Added
+        'M': 0,  # Modified
+        'D': 0,  # Deleted
+        'R': 0,  # Renamed
+        'C': 0,  # Copied
+        'T': 0   # Type changed (e.g. symlink to file)
     }
     
-    extensions = {}
+    extensions = Counter()
     
     for status, file_path in staged_files:
         # Categorize by status
         if status in categories:
-            categories[status]['count'] += 1
-            categories[status]['files'].append(file_path)
+            categories[status] += 1
         
-        # Categorize by extension
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lstrip('.')
-        if ext:
-            extensions[ext] = extensions.get(ext, 0) + 1
+        # Categorize by extension; like os.path.splitext, a dot inside a
+        # directory name or leading the file name does not start an extension
+        head, dot, ext = file_path.rpartition('.')
+        if dot and ext and '/' not in ext and head.rpartition('/')[2].strip('.'):
+            extensions[ext] += 1
     
     return categories, extensions
 
-def get_file_changes(repo, file_path, status):
+def get_file_changes(backend, file_path, status):
     """Get specific changes in a file."""
     if status == 'D':
         return "File deleted"
     
     try:
-        diff = repo.git.diff('--cached', '--', file_path)
+        diff = backend.staged_diff(file_path)
         
         # Extract the most significant changes
         added_lines = []
         removed_lines = []
         
         for line in diff.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
+            marker = line[:1]
+            if marker == '+' and not line.startswith('+++'):
                 added_lines.append(line[1:].strip())
-            elif line.startswith('-') and not line.startswith('---'):
+            elif marker == '-' and not line.startswith('---'):
                 removed_lines.append(line[1:].strip())
         
         return {
             'added': added_lines,
             'removed': removed_lines
         }
-    except:
+    except subprocess.CalledProcessError:
         return "Unable to get diff"
 
-def analyze_changes(repo, staged_files):
+def get_all_file_changes(backend, staged_files):
+    """Get specific changes for every staged file."""
+    # The backend reads all per-file diffs in one pass, so there is no git
+    # call left to overlap and the files are simply processed in order
+    return [get_file_changes(backend, file_path, status) for status, file_path in staged_files]
+
+def analyze_changes(backend, staged_files):
     """Analyze the changes to generate a meaningful commit message."""
-    categories, extensions = categorize_changes(staged_files)
-    
-    # Get the most changed file for detailed analysis
-    most_changed_category = max(categories.items(), key=lambda x: x[1]['count'])
-    
-    # Simple heuristic-based message generation
+    # Simple heuristic-based message generation; a single file needs no categorization
     if len(staged_files) == 1:
         status, file_path = staged_files[0]
         file_name = os.path.basename(file_path)
@@ -163,49 +420,204 @@ def analyze_changes(repo, staged_files):
             return f"Delete {file_name}"
         elif status == 'R':
             return f"Rename file to {file_name}"
+        elif status == 'T':
+            return f"Change type of {file_name}"
+    
+    categories, extensions = categorize_changes(staged_files)
+    # Every staged file counts, whatever its status
+    file_count = len(staged_files)
     
-    # Multiple files changed
+    # Multiple files changed; an action is primary when it covers at least half of them
     primary_action = None
-    if categories['A']['count'] > 0 and categories['A']['count'] >= sum(c['count'] for s, c in categories.items() if s != 'A'):
+    if categories['A'] > 0 and 2 * categories['A'] >= file_count:
         primary_action = "Add"
-    elif categories['M']['count'] > 0 and categories['M']['count'] >= sum(c['count'] for s, c in categories.items() if s != 'M'):
+    elif categories['M'] > 0 and 2 * categories['M'] >= file_count:
         primary_action = "Update"
-    elif categories['D']['count'] > 0 and categories['D']['count'] >= sum(c['count'] for s, c in categories.items() if s != 'D'):
+    elif categories['D'] > 0 and 2 * categories['D'] >= file_count:
         primary_action = "Remove"
     
     # Determine the scope of changes
     scope = None
     if len(extensions) == 1:
-        ext = next(iter(extensions))
-        if ext in ['js', 'ts']:
-            scope = "JavaScript"
-        elif ext in ['py']:
-            scope = "Python"
-        elif ext in ['css', 'scss']:
-            scope = "styles"
-        elif ext in ['html']:
-            scope = "HTML"
-        elif ext in ['md', 'txt']:
-            scope = "documentation"
-        elif ext in ['json', 'yaml', 'yml', 'toml']:
-            scope = "configuration"
+        scope = EXTENSION_SCOPES.get(next(iter(extensions)))
     
     # Generate message based on analysis
     if primary_action and scope:
         return f"{primary_action} {scope} files"
     elif primary_action:
-        file_count = sum(c['count'] for c in categories.values())
         return f"{primary_action} {file_count} files"
     else:
         # Fallback to generic message
-        file_count = sum(c['count'] for c in categories.values())
         return f"Update {file_count} files"
 
-def get_full_diff(repo):
+def get_full_diff(backend):
     """Get the full diff of staged changes."""
-    return repo.git.diff('--cached')
+    return backend.staged_full_diff()
 
-def generate_ai_commit_message(repo, staged_files, config):
+def unquote_git_path(path):
+    """Undo the C-style quoting git applies to unusual paths in diff headers."""
+    if not path.startswith('"'):
+        return path
+    
+    unquoted = bytearray()
+    i = 1
+    while i < len(path) and path[i] != '"':
+        if path[i] != '\\':
+            unquoted += path[i].encode('utf-8')
+            i += 1
+        elif path[i + 1] in '01234567':
+            # Octal escapes hold the raw bytes of non-ASCII characters
+            unquoted.append(int(path[i + 1:i + 4], 8))
+            i += 4
+        else:
+            unquoted.append(GIT_QUOTED_ESCAPES.get(path[i + 1], ord(path[i + 1])))
+            i += 2
+    return unquoted.decode('utf-8', errors='replace')
+
+def get_file_diff_path(section):
+    """Get the path a "diff --git" section belongs to, as name-status reports it."""
+    header, *lines = section.split('\n')
+    old_path = None
+    for line in lines:
+        if line.startswith('@@ '):
+            break
+        if line.startswith(('rename to ', 'copy to ')):
+            return unquote_git_path(line.split(' ', 2)[2])
+        if line.startswith(('--- a/', '--- "a/', '+++ b/', '+++ "b/')):
+            # git appends a tab to unquoted paths that contain spaces
+            path = line[4:]
+            if not path.startswith('"'):
+                path = path.rstrip('\t')
+            path = unquote_git_path(path)[2:]
+            if line[0] == '+':
+                return path
+            old_path = path
+    if old_path is not None:
+        # Deleted file, whose new side is /dev/null
+        return old_path
+    
+    # Binary or mode-only changes have no ---/+++ lines. Without a rename or
+    # copy both sides of "diff --git a/<path> b/<path>" are the same length,
+    # so the second half is the new path.
+    sides = header[len('diff --git '):]
+    return unquote_git_path(sides[(len(sides) + 1) // 2:])[2:]
+
+def split_diff_by_file(diff):
+    """Split a full diff into (path, file diff) pairs.
+    
+    Sections are keyed by the path in their own headers rather than paired
+    with the name-status by position: git emits two sections for a type
+    change (the old entry deleted, the new one added), which are merged.
+    """
+    file_diffs = {}
+    for section in FILE_DIFF_START_RE.split(diff):
+        if section.startswith('diff --git '):
+            file_path = get_file_diff_path(section)
+            if file_path in file_diffs:
+                file_diffs[file_path] += section
+            else:
+                file_diffs[file_path] = section
+    return list(file_diffs.items())
+
+def get_token_counter(model):
+    """Return a function counting the prompt tokens of a string for a model."""
+    if TIKTOKEN_AVAILABLE:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+            return lambda text: len(encoding.encode(text))
+        except Exception:
+            # Unknown model, or the encoding could not be downloaded
+            pass
+    # Roughly four characters per token for English text and code
+    return lambda text: len(text) // 4
+
+def select_prompt_diffs(file_diffs, model):
+    """Pick the file diffs to send to the model within DIFF_TOKEN_BUDGET.
+    
+    Generated files are listed without their diff. Other files are filled in
+    greedily and cut at hunk boundaries, so the model never sees a partial
+    line or hunk. Pieces are measured as they appear in the JSON prompt,
+    where newlines, tabs and quotes are escaped.
+    """
+    count_text_tokens = get_token_counter(model)
+    count_tokens = lambda text: count_text_tokens(json.dumps(text, ensure_ascii=False))
+    remaining = DIFF_TOKEN_BUDGET
+    files = []
+    
+    for file_path, file_diff in file_diffs:
+        if GENERATED_FILE_RE.search(file_path):
+            files.append({'path': file_path, 'diff': "(generated file, diff omitted)"})
+            continue
+        
+        # The file header followed by one section per "@@" hunk
+        header, *hunks = HUNK_START_RE.split(file_diff)
+        used = count_tokens(header)
+        if used > remaining:
+            files.append({'path': file_path, 'diff': "(diff omitted due to size)"})
+            continue
+        
+        kept = [header]
+        for hunk in hunks:
+            hunk_tokens = count_tokens(hunk)
+            if used + hunk_tokens > remaining:
+                kept.append("...\n(diff truncated due to size)")
+                break
+            kept.append(hunk)
+            used += hunk_tokens
+        
+        files.append({'path': file_path, 'diff': ''.join(kept)})
+        remaining -= used
+    
+    return files
+
+# Prefix of the temporary files AI responses are written to before being cached
+CACHE_TEMP_PREFIX = '.tmp-'
+
+def get_message_cache_dir(git_root):
+    """Get the directory caching AI responses, or None if there is no .git directory."""
+    git_dir = os.path.join(git_root, '.git')
+    if not os.path.isdir(git_dir):
+        return None
+    return os.path.join(git_dir, 'autocommit-cache')
+
+def read_message_cache(cache_dir, key):
+    """Return the cached AI response for a key, or None on a miss."""
+    cache_file = os.path.join(cache_dir, key)
+    try:
+        with open(cache_file) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    # Mark the entry as recently used for the LRU sweep
+    try:
+        os.utime(cache_file)
+    except OSError:
+        # Read-only .git, or the entry was just swept; the hit is still good
+        pass
+    return result
+
+def write_message_cache(cache_dir, key, result, cache_size):
+    """Atomically store an AI response and evict the least recently used entries."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, prefix=CACHE_TEMP_PREFIX, delete=False) as f:
+            json.dump(result, f)
+        os.replace(f.name, os.path.join(cache_dir, key))
+        
+        # Leave out files other runs are still writing
+        entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                   if not name.startswith(CACHE_TEMP_PREFIX)]
+        if len(entries) > cache_size:
+            entries.sort(key=os.path.getmtime)
+            for entry in entries[:len(entries) - cache_size]:
+                os.remove(entry)
+    except OSError:
+        # The cache is only an optimization; never fail the commit over it
+        pass
+
+def generate_ai_commit_message(backend, staged_files, config):
     """Generate a commit message using AI."""
     if not OPENAI_AVAILABLE:
         print("OpenAI package not installed. Run 'pip install openai' to use AI-powered commit messages.")
@@ -216,41 +628,50 @@ def generate_ai_commit_message(repo, staged_files, config):
         return None
     
     # Get the full diff
-    diff = get_full_diff(repo)
+    diff = get_full_diff(backend)
     if not diff:
         return None
     
-    # Truncate diff if it's too large
-    if len(diff) > 4000:  # Keeping some room for the prompt
-        diff = diff[:4000] + "\n...\n(diff truncated due to size)"
+    # Send the diff as a list of files so a single request covers all of them
+    files = select_prompt_diffs(split_diff_by_file(diff), config['openai_model'])
     
     # Configure OpenAI client
+    import openai
     client = openai.OpenAI(api_key=config['openai_api_key'])
     
     # Prepare the prompt
     if config['conventional_commits']:
-        system_prompt = """Generate a concise git commit message based on the provided diff. 
+        system_prompt = f"""Generate a concise git commit message based on the provided diff. 
         Follow the Conventional Commits format: <type>[(scope)]: <description>
         
         Types: feat, fix, docs, style, refactor, perf, test, build, ci, chore, revert
         
-        IMPORTANT: Keep the message under 100 characters total, including the type prefix.
+        IMPORTANT: Keep the message under {config['max_length']} characters total, including the type prefix.
         
         Be specific and descriptive while being concise. Avoid generic terms like "update", "fix", 
         or "change" without context. Focus on WHAT changed and WHY, not HOW.
         """
     else:
-        system_prompt = """Generate a concise git commit message based on the provided diff.
+        system_prompt = f"""Generate a concise git commit message based on the provided diff.
         
-        IMPORTANT: Keep the message under 100 characters total.
+        IMPORTANT: Keep the message under {config['max_length']} characters total.
         
         Be specific and descriptive while being concise. Avoid generic terms like "update", "fix", 
         or "change" without context. Focus on WHAT changed and WHY, not HOW.
         """
     
+    system_prompt += """
+        The diff is given as a JSON object {"files": [{"path": ..., "diff": ...}]}.
+        Return a JSON object {"subject": "<commit message>", "per_file": [{"path": "<path>", "summary": "<what changed>"}]}
+        with "subject" as the first key.
+        """
+    system_prompt += f"""
+        Keep each summary short, and list at most {PER_FILE_SUMMARY_LIMIT} files in "per_file", picking the most significant ones.
+        """
+    
     try:
-        # Set a consistent character limit for all commit messages
-        char_limit = 100
+        # Use the same character limit as rule-based commit messages
+        char_limit = config['max_length']
         
         # Ask if user wants a detailed explanation of changes (will be shown separately)
         detailed = False
@@ -259,18 +680,73 @@ def generate_ai_commit_message(repo, staged_files, config):
         else:
             detailed = input("\nGenerate a detailed explanation of changes? (y/N): ").strip().lower() == 'y'
         
-        # Generate the concise commit message first
-        response = client.chat.completions.create(
-            model=config['openai_model'],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Here's the git diff:\n\n{diff}"}
-            ],
-            max_tokens=100,  # Keep this relatively small for concise messages
-            temperature=0.7
-        )
+        # The detailed explanation comes back in the same response
+        if detailed:
+            system_prompt += """
+            Also include a "details" key with a detailed explanation of the changes: WHAT changed
+            in specific terms, WHY the change was made and any important technical details,
+            in a single sentence that is under 120 characters.
+            """
+        
+        # Keep non-ASCII text as is rather than as \uXXXX escapes, which take
+        # several times the tokens counted in select_prompt_diffs
+        user_prompt = json.dumps({'files': files}, ensure_ascii=False)
+        
+        # Re-running on the same staged changes reuses the previous response
+        cache_dir = get_message_cache_dir(backend.git_root) if config['commit_cache_size'] > 0 else None
+        key = hashlib.sha1((user_prompt + config['openai_model'] + system_prompt).encode('utf-8')).hexdigest()
+        result = read_message_cache(cache_dir, key) if cache_dir else None
+        
+        if result is None:
+            # One request returns the commit message and the per-file summaries.
+            # Without a detailed explanation only the subject is needed, so the
+            # token budget follows max_length (plus the JSON framing) and the
+            # stream is closed as soon as the subject is complete. Otherwise the
+            # budget grows with the number of per-file summaries to expect.
+            if detailed:
+                max_tokens = 200 + PER_FILE_SUMMARY_TOKENS * min(len(files), PER_FILE_SUMMARY_LIMIT)
+            else:
+                max_tokens = max(16, char_limit // 3) + 8
+            response = client.chat.completions.create(
+                model=config['openai_model'],
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.7,
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            
+            content = ''
+            result = None
+            for chunk in response:
+                if chunk.choices:
+                    content += chunk.choices[0].delta.content or ''
+                if not detailed:
+                    subject = SUBJECT_RE.search(content)
+                    if subject:
+                        result = {'subject': json.loads(subject.group(1))}
+                        break
+            response.close()
+            
+            complete = True
+            if result is None:
+                try:
+                    result = json.loads(content)
+                except ValueError:
+                    # A response cut off by max_tokens can still hold the whole subject
+                    subject = SUBJECT_RE.search(content)
+                    if not subject:
+                        raise
+                    result = {'subject': json.loads(subject.group(1))}
+                    complete = False
+            if cache_dir and complete:
+                write_message_cache(cache_dir, key, result, config['commit_cache_size'])
         
-        message = response.choices[0].message.content.strip()
+        # git commit -m takes the whole string, so keep only the subject line
+        message = result['subject'].strip().split('\n', 1)[0].strip()
         
         # Apply prefix if configured and not using conventional commits
         if config['prefix'] and not config['conventional_commits']:
@@ -280,29 +756,12 @@ def generate_ai_commit_message(repo, staged_files, config):
         if len(message) > char_limit:
             message = message[:char_limit - 3] + "..."
         
-        # If detailed explanation is requested, generate it separately
         if detailed:
-            detail_prompt = """Based on the git diff, provide a detailed explanation of the changes.
-            Include:
-            WHAT changed in specific terms and WHY the change was made anad Any important technical details
-            
-            Format your response in a single sentence that is under 120 characters
-            """
-            
-            detail_response = client.chat.completions.create(
-                model=config['openai_model'],
-                messages=[
-                    {"role": "system", "content": detail_prompt},
-                    {"role": "user", "content": f"Here's the git diff:\n\n{diff}"}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            details = detail_response.choices[0].message.content.strip()
             print("\n\nDetailed explanation of changes:")
             print("==================================")
-            print(details)
+            print(result.get('details', '').strip())
+            for summary in result.get('per_file', []):
+                print(f"- {summary.get('path', '')}: {summary.get('summary', '')}")
             print("==================================")
             print("\nThe above detailed explanation will NOT be included in the commit message.")
             print(f"Your commit message will be: {message}\n")
@@ -312,17 +771,17 @@ def generate_ai_commit_message(repo, staged_files, config):
         print(f"Error generating AI commit message: {str(e)}")
         return None
 
-def generate_commit_message(repo, staged_files, config):
+def generate_commit_message(backend, staged_files, config):
     """Generate a commit message based on the staged changes."""
     # Try AI-powered message generation first if enabled
     if config['use_ai']:
-        ai_message = generate_ai_commit_message(repo, staged_files, config)
+        ai_message = generate_ai_commit_message(backend, staged_files, config)
         if ai_message:
             return ai_message
         print("Falling back to rule-based commit message generation...")
     
     # Fallback to rule-based message generation
-    message = analyze_changes(repo, staged_files)
+    message = analyze_changes(backend, staged_files)
     
     # Apply prefix if configured
     if config['prefix']:
@@ -343,8 +802,7 @@ def setup_config():
         print(f"Configuration file already exists at {config_file}")
         return
     
-    config = configparser.ConfigParser()
-    config['autocommit'] = {
+    settings = {
         'prefix': '',
         'prefixes': 'feat:, fix:, docs:, style:, refactor:, perf:, test:, build:, ci:, chore:',
         'max_length': '72',
@@ -352,15 +810,26 @@ def setup_config():
         'openai_api_key': '',
         'openai_model': 'gpt-3.5-turbo',
         'conventional_commits': 'false',
-        'detailed_by_default': 'false'
+        'detailed_by_default': 'false',
+        'commit_cache_size': '32'
     }
     
     with open(config_file, 'w') as f:
-        config.write(f)
+        f.write("[autocommit]\n")
+        for key, value in settings.items():
+            f.write(f"{key} = {value}\n")
     
     print(f"Created configuration file at {config_file}")
     print("Edit this file to customize the behavior of git-autocommit.")
 
+def commit_changes(git_root, message):
+    """Commit the staged changes with the given message."""
+    try:
+        run_git(git_root, 'commit', '-m', message)
+    except subprocess.CalledProcessError:
+        print("Error: git commit failed.")
+        sys.exit(1)
+
 def select_prefix(config):
     """Allow the user to select a prefix from the configured list."""
     if not config['prefixes']:
@@ -386,15 +855,127 @@ def select_prefix(config):
         except ValueError:
             print("Please enter a number.")
 
-def main():
+def run_daemon():
+    """Serve git-autocommit runs over a Unix socket from a warm interpreter.
+    
+    Each connection sends one JSON line {"cwd", "argv", "env"}, where "env"
+    is the client's whole environment, then acts as
+    the run's stdin and stdout. The daemon ends the output with a NUL byte
+    followed by the exit code. Every run is handled in a process forked from
+    the daemon, so runs don't share their working directory, environment or
+    standard streams, and one waiting at a prompt doesn't hold up the others.
+    """
+    import io
+    import fcntl
+    import signal
+    import socket
+    import socketserver
+    import traceback
+    from autocommit_socket import get_daemon_socket_path
+    
+    class Handler(socketserver.StreamRequestHandler):
+        # Give up on a run left waiting at a prompt after ten minutes
+        timeout = 600
+        
+        def handle(self):
+            # Runs are stopped by SIGTERM like any other process
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            line = self.rfile.readline()
+            if not line:
+                # A starting daemon checking whether this one is listening
+                return
+            request = json.loads(line)
+            stdin = io.TextIOWrapper(self.rfile, encoding='utf-8')
+            stdout = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            
+            exit_code = 0
+            try:
+                # Run with the client's whole environment (git author, index,
+                # signing settings and so on), not the daemon's
+                os.environ.clear()
+                os.environ.update(request['env'])
+                sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stdout
+                os.chdir(request['cwd'])
+                main(request['argv'], allow_daemon=False)
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    exit_code = e.code
+                elif e.code is not None:
+                    print(e.code)
+                    exit_code = 1
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            
+            stdout.write(f"\0{exit_code}")
+            stdout.flush()
+    
+    class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        pass
+    
+    # Runs are forked from this process, so import the heavy optional
+    # dependencies once here rather than in every run
+    for module_name in ('openai', 'pygit2', 'tiktoken'):
+        if is_installed(module_name):
+            importlib.import_module(module_name)
+    
+    socket_path = get_daemon_socket_path()
+    
+    # The socket accepts arbitrary runs, so keep it (and its lock) private to the user
+    old_umask = os.umask(0o077)
+    try:
+        # Clients that find no daemon may start several at once; the lock
+        # lets only one of them replace a stale socket and bind
+        with open(socket_path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Nothing listening; the file, if any, is left by a dead daemon
+                if os.path.exists(socket_path):
+                    os.remove(socket_path)
+            else:
+                print(f"git-autocommit daemon already listening on {socket_path}")
+                return
+            finally:
+                probe.close()
+            server = Server(socket_path, Handler)
+    finally:
+        os.umask(old_umask)
+    
+    # Let `kill` stop the daemon through the cleanup below as well
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    
+    print(f"git-autocommit daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+def main(argv=None, allow_daemon=True):
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Git Auto Commit Message Generator')
     parser.add_argument('--setup', action='store_true', help='Setup initial configuration')
+    parser.add_argument('--daemon', action='store_true', help='Serve runs from git-auto-commit-client.py over a Unix socket')
     parser.add_argument('--use-ai', action='store_true', help='Use AI to generate commit message')
     parser.add_argument('--conventional', action='store_true', help='Use Conventional Commits format')
     parser.add_argument('--no-prefix-selection', action='store_true', help='Skip prefix selection')
     parser.add_argument('--detailed', action='store_true', help='Generate a detailed AI commit message')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    
+    if args.daemon:
+        # Runs forwarded by the daemon must not start a nested daemon
+        if not allow_daemon:
+            print("Error: --daemon cannot be used through git-auto-commit-client.py")
+            sys.exit(1)
+        run_daemon()
+        return
     
     if args.setup:
         setup_config()
@@ -402,7 +983,6 @@ def main():
     
     # Get git repository
     git_root = get_git_root()
-    repo = Repo(git_root)
     
     # Get configuration
     config = get_config(git_root)
@@ -415,8 +995,11 @@ def main():
     if args.detailed:
         config['detailed_by_default'] = True
     
+    # Only read the patch text up front when the AI path will send it
+    backend = GitBackend(git_root, prefetch_diff=config['use_ai'])
+    
     # Get staged files
-    staged_files = get_staged_files(repo)
+    staged_files = get_staged_files(backend)
     
     # Allow user to select a prefix if there are prefixes configured and not skipped
     if config['prefixes'] and not args.no_prefix_selection:
@@ -424,18 +1007,18 @@ def main():
         config['prefix'] = selected_prefix
     
     # Generate commit message
-    commit_message = generate_commit_message(repo, staged_files, config)
+    commit_message = generate_commit_message(backend, staged_files, config)
     
     # Perform the commit
     print(f"\nGenerated commit message: {commit_message}")
     confirm = input("Proceed with this commit message? (y/n/edit): ").strip().lower()
     
     if confirm == 'y':
-        repo.git.commit('-m', commit_message)
+        commit_changes(git_root, commit_message)
         print("Changes committed successfully!")
     elif confirm == 'edit':
         edited_message = input("Enter your commit message: ").strip()
-        repo.git.commit('-m', edited_message)
+        commit_changes(git_root, edited_message)
         print("Changes committed with edited message!")
     else:
         print("Commit aborted.")
@@ -6,8 +6,9 @@ SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 TARGET_DIR="/usr/local/bin"
 SCRIPT_PATH="$SCRIPT_DIR/git-auto-commit.py"
 
-# Make the script executable
+# Make the scripts executable
 chmod +x "$SCRIPT_PATH"
+chmod +x "$SCRIPT_DIR/git-auto-commit-client.py"
 
 # Create symbolic link
 echo "Creating symbolic link to git-auto-commit.py in $TARGET_DIR..."